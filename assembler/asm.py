@@ -3,6 +3,7 @@
 from enum import Enum
 import argparse
 import difflib
+import functools
 import hashlib
 import json
 import sys
@@ -11,6 +12,7 @@ SEGMENT_LENGTH = 131072
 ASM_COMMANDS = dict()
 DEBUG_OUTPUT = False
 VALID_HEX = "0123456789ABCDEFabcdef"
+EMPTY_SEGMENT = bytes(SEGMENT_LENGTH)
 
 
 def mod_s16(value):
@@ -37,6 +39,12 @@ def asm_directive(fn):
     return fn
 
 
+@functools.cache
+def sorted_command_names():
+    # All commands are registered at import time, so this never changes afterwards.
+    return sorted(ASM_COMMANDS.keys())
+
+
 class ArgType(Enum):
     REGISTER = 1
     IMMEDIATE = 2
@@ -106,8 +114,15 @@ class ForwardReference:
 
 
 class Assembler:
-    def __init__(self):
+    def __init__(self, segment=None):
         self.segment_words = [None] * (SEGMENT_LENGTH // 2)
+        # Big-endian copy of segment_words, with zeros where nothing was written:
+        if segment is None:
+            segment = bytearray(SEGMENT_LENGTH)
+        else:
+            assert len(segment) == SEGMENT_LENGTH
+            segment[:] = EMPTY_SEGMENT
+        self.segment = segment
         self.current_lineno = None
         self.current_pointer = 0x0000
         self.unused_labels = set()
@@ -143,6 +158,8 @@ class Assembler:
                 f"Attempted to overwrite word 0x{self.segment_words[self.current_pointer]:04X} at 0x{self.current_pointer:04X} with 0x{word:04X}."
             )
         self.segment_words[self.current_pointer] = word
+        self.segment[2 * self.current_pointer] = word >> 8
+        self.segment[2 * self.current_pointer + 1] = word & 0xFF
         assert self.current_pointer not in self.mapping
         self.mapping[self.current_pointer] = self.current_lineno
         self.advance(1)
@@ -1393,9 +1410,7 @@ class Assembler:
             print(f"{lineno}: {line}  # {command=} {args=}")
         command_fn = ASM_COMMANDS.get(command)
         if command_fn is None:
-            suggestions = difflib.get_close_matches(
-                command, sorted(list(ASM_COMMANDS.keys()))
-            )
+            suggestions = difflib.get_close_matches(command, sorted_command_names())
             if suggestions:
                 plural = "es" if len(suggestions) > 1 else ""
                 return self.error(
@@ -1405,7 +1420,11 @@ class Assembler:
 
         return command_fn(self, command, args)
 
-    def segment_bytes(self):
+    def finish_segment(self):
+        """
+        Runs the final checks on the assembled program, and returns whether self.segment
+        is usable. Any problems are reported through self.error.
+        """
         assert len(self.segment_words) == 65536
         has_problem = False
         if self.forward_references:
@@ -1432,22 +1451,22 @@ class Assembler:
             )
             has_problem = True
         if has_problem:
-            return None
-        segment = bytearray(SEGMENT_LENGTH)
-        for i, word in enumerate(self.segment_words):
-            if word is not None:
-                segment[2 * i] = word >> 8
-                segment[2 * i + 1] = word & 0xFF
-        segment_bytes = bytes(segment)
+            return False
         if self.expect_hash is not None:
             hash_line, expect_hash_hex = self.expect_hash
-            actual_hash_hex = hashlib.sha256(segment_bytes).hexdigest().upper()
+            actual_hash_hex = hashlib.sha256(self.segment).hexdigest().upper()
             if actual_hash_hex != expect_hash_hex:
                 self.error(
                     f"Compilation successful, but encountered hash mismatch: line {hash_line} expects hash {expect_hash_hex}, but created hash {actual_hash_hex} instead."
                 )
-                return None
-        return segment_bytes
+                return False
+        return True
+
+    def segment_bytes(self):
+        if not self.finish_segment():
+            return None
+        # The bytes were already written by push_word, so this doesn't need to look at all 64K words.
+        return bytes(self.segment)
 
 
 class CompilationResult:
@@ -1475,6 +1494,21 @@ def compile_assembly(asm_text):
     return CompilationResult(segment, asm.error_log, mapping)
 
 
+def compile_assembly_into(asm_text, segment):
+    """
+    Like compile_assembly, but writes the program into the given bytearray of length
+    SEGMENT_LENGTH instead of allocating a new one. On success, the result's segment is
+    that very bytearray, so it is only valid until the buffer is reused.
+    """
+    asm = Assembler(segment)
+    for i, line in enumerate(asm_text.split("\n")):
+        if not asm.parse_line(line, i + 1):
+            return CompilationResult(None, asm.error_log, None)
+    if not asm.finish_segment():
+        return CompilationResult(None, asm.error_log, None)
+    return CompilationResult(segment, asm.error_log, asm.mapping)
+
+
 def run_on_files(args):
     asm_text = args.infile.read()
     result = compile_assembly(asm_text)
@@ -1,8 +1,9 @@
 // This lint could have been useful, but it generates too many false positives, so deactivate it:
 #![allow(clippy::cast_possible_truncation)]
 
-use std::io::{Error, ErrorKind, Result};
-use std::{env, fs, process};
+use std::collections::HashMap;
+use std::io::{BufRead, Error, ErrorKind, Result};
+use std::{env, fs, io, process};
 
 use tinyvm::{Game, GameResult, Segment, WinReason};
 
@@ -30,23 +31,38 @@ fn parse_segment(segment_bytes: &[u8], segment_type: &str) -> Result<Segment> {
     Ok(segment)
 }
 
-fn parse_args() -> Result<(Segment, Segment)> {
+enum Mode {
+    SingleMatchup(Segment, Segment),
+    Serve,
+}
+
+fn load_segments(path_one: &str, path_two: &str) -> Result<(Segment, Segment)> {
+    let instructions_one_bytes = fs::read(path_one)?;
+    let instructions_two_bytes = fs::read(path_two)?;
+
+    Ok((
+        parse_segment(&instructions_one_bytes, "player one instruction")?,
+        parse_segment(&instructions_two_bytes, "player two instruction")?,
+    ))
+}
+
+fn parse_args() -> Result<Mode> {
     let args = env::args().collect::<Vec<_>>();
+    if args.len() == 2 && args[1] == "--serve" {
+        return Ok(Mode::Serve);
+    }
     if args.len() != 3 {
         eprintln!(
             "USAGE: {} /path/to/instruction_segment_player_one /path/to/instruction_segment_player_two",
             args[0]
         );
+        eprintln!("   or: {} --serve", args[0]);
+        eprintln!("In serve mode, each line on stdin must contain two tab-separated paths. The result of each matchup is printed as usual, and ends with a line containing only ']'.");
         process::exit(1);
     }
 
-    let instructions_one_bytes = fs::read(args[1].clone())?;
-    let instructions_two_bytes = fs::read(args[2].clone())?;
-
-    Ok((
-        parse_segment(&instructions_one_bytes, "player one instruction")?,
-        parse_segment(&instructions_two_bytes, "player two instruction")?,
-    ))
+    let (instructions_one, instructions_two) = load_segments(&args[1], &args[2])?;
+    Ok(Mode::SingleMatchup(instructions_one, instructions_two))
 }
 
 fn run_and_print_game(instructions_one: &Segment, instructions_two: &Segment) -> bool {
@@ -92,19 +108,53 @@ fn run_and_print_game(instructions_one: &Segment, instructions_two: &Segment) ->
     game.was_deterministic_so_far()
 }
 
-fn main() -> Result<()> {
-    let (instructions_one, instructions_two) = parse_args()?;
-
+fn run_and_print_matchup(instructions_one: &Segment, instructions_two: &Segment) {
     print!("[");
-    let first_was_deterministic = run_and_print_game(&instructions_one, &instructions_two);
+    let first_was_deterministic = run_and_print_game(instructions_one, instructions_two);
     if !first_was_deterministic {
         for _ in 0..99 {
             print!(",");
-            let was_deterministic = run_and_print_game(&instructions_one, &instructions_two);
+            let was_deterministic = run_and_print_game(instructions_one, instructions_two);
             assert!(!was_deterministic);
         }
     }
     println!("]");
+}
+
+fn serve() -> Result<()> {
+    // Every VM plays many matchups, so read and parse each segment file only once per process.
+    // The files are not expected to change while a tournament is running.
+    let mut segments = HashMap::<String, Segment>::new();
+    for line in io::stdin().lock().lines() {
+        let line = line?;
+        let Some((path_one, path_two)) = line.split_once('\t') else {
+            return Err(Error::new(
+                ErrorKind::InvalidInput,
+                format!("Expected two tab-separated paths, got {line:?} instead."),
+            ));
+        };
+        for (path, segment_type) in [
+            (path_one, "player one instruction"),
+            (path_two, "player two instruction"),
+        ] {
+            if !segments.contains_key(path) {
+                let segment = parse_segment(&fs::read(path)?, segment_type)?;
+                segments.insert(path.to_owned(), segment);
+            }
+        }
+        // Stdout is line-buffered, so the final "]" line also flushes the result.
+        run_and_print_matchup(&segments[path_one], &segments[path_two]);
+    }
 
     Ok(())
 }
+
+fn main() -> Result<()> {
+    match parse_args()? {
+        Mode::SingleMatchup(instructions_one, instructions_two) => {
+            run_and_print_matchup(&instructions_one, &instructions_two);
+            Ok(())
+        }
+        Mode::Serve => serve(),
+    }
+}
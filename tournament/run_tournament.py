@@ -2,16 +2,29 @@
 
 import asyncio
 import collections
+import concurrent.futures
+import functools
 import json
 import os.path
 import random
+import string
+import subprocess
 import time
 
+try:
+    # Optional, but parses and serializes the results considerably faster.
+    import orjson
+except ImportError:
+    orjson = None
+
 VMS_DIR = "../vms/connect4/"
 OUTPUT_DIR = "pages/"
 CARGO_BINARY = "cargo"
 TIMEOUT_SECONDS = 40
+# The output of a single matchup easily exceeds asyncio's default line limit of 64 KiB:
+MATCHUP_OUTPUT_LIMIT = 16 * 1024 * 1024
 GAMMA = 2.2
+INV_GAMMA = 1 / GAMMA
 VALUE_MIN = 48
 BOARD_WIDTH = 7
 BOARD_HEIGHT = 6
@@ -22,26 +35,30 @@ DET_TEXT_MANY_EXTREME = "This matchup is not deterministic. Some games went diff
 DET_TEXT_MANY_VARIED = "This matchup is not deterministic."
 
 TIMESTAMP = time.strftime("%Y-%m-%d %T %Z")
+THIS_FILES_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 class VM:
     def __init__(self, name):
         self.name = name
+        self.filename = VMS_DIR + name + ".segment"
         self.matchups = dict()
-
-    def filename(self):
-        return VMS_DIR + self.name + ".segment"
+        # Values are (wins, draws, losses), computed once per matchup by run_matchup:
+        self.matchup_stats = dict()
 
 
 def change_to_this_files_dir():
-    os.chdir(os.path.dirname(__file__))
+    if os.getcwd() != THIS_FILES_DIR:
+        os.chdir(THIS_FILES_DIR)
 
 
 def collect_vms():
-    vms = []
-    for filename in os.listdir(VMS_DIR):
-        if filename.endswith(".segment"):
-            vms.append(VM(filename[: -len(".segment")]))
+    with os.scandir(VMS_DIR) as entries:
+        vms = [
+            VM(entry.name[: -len(".segment")])
+            for entry in entries
+            if entry.name.endswith(".segment")
+        ]
     vms.sort(key=lambda vm: vm.name)
     for i in range(len(vms) - 1):
         if vms[i + 1].name.startswith(vms[i].name):
@@ -58,84 +75,113 @@ def analyze_matchup(matchup):
     losses = 0
     for game in matchup:
         result = game["res"]
-        if result["type"] == "draw":
+        result_type = result["type"]
+        if result_type == "draw":
             draws += 1
-        elif result["type"] == "win" and result["by"] == 1:
+        elif result_type == "win" and result["by"] == 1:
             wins += 1
-        elif result["type"] == "win" and result["by"] == 2:
+        elif result_type == "win" and result["by"] == 2:
             losses += 1
         else:
             assert False, game
     return wins, draws, losses
 
 
-async def run_matchup(vm_one, vm_two):
+def build_release_binary():
+    # Build once, instead of letting every single matchup go through "cargo run".
+    command = [CARGO_BINARY, "build", "--release", "--message-format=json"]
+    result = subprocess.run(command, stdout=subprocess.PIPE)
+    if result.returncode != 0:
+        print(f"ERROR! Building the VM failed. {command=} {result.returncode=}")
+        exit(1)
+    for line in result.stdout.splitlines():
+        message = json.loads(line)
+        if message.get("reason") == "compiler-artifact" and message.get("executable"):
+            return message["executable"]
+    print("ERROR! Building the VM did not produce any executable?!")
+    exit(1)
+
+
+async def run_matchup(proc, vm_one, vm_two):
     assert vm_two.name not in vm_one.matchups
-    command = [
-        CARGO_BINARY,
-        "run",
-        "--release",
-        "--",
-        vm_one.filename(),
-        vm_two.filename(),
-    ]
-    proc = await asyncio.create_subprocess_exec(
-        *command,
-        stdin=asyncio.subprocess.DEVNULL,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        # asyncio doesn't support text=True :(
-    )
+    proc.stdin.write(f"{vm_one.filename}\t{vm_two.filename}\n".encode())
     try:
-        stdout_bin, stderr_bin = await asyncio.wait_for(
-            proc.communicate(), timeout=TIMEOUT_SECONDS
+        await proc.stdin.drain()
+        # In serve mode, the result of each matchup ends with a line containing only "]".
+        stdout_bin = await asyncio.wait_for(
+            proc.stdout.readuntil(b"\n]\n"), timeout=TIMEOUT_SECONDS
         )
-    except TimeoutError:
-        stderr_bin = b"<timeout>"
-    if proc.returncode != 0:
+    except (
+        TimeoutError,
+        ConnectionError,
+        asyncio.IncompleteReadError,
+        asyncio.LimitOverrunError,
+    ) as e:
         print(
             f"ERROR! Running on {vm_one.name} and {vm_two.name} resulted in an error."
         )
-        print(f"{command=} {proc.returncode=}")
-        print("<=== BEGIN STDERR DUMP ===>")
-        print(stderr_bin.decode(errors="replace"))
-        print("<=== END STDERR DUMP ===>")
-        # Abort everything.
-        # Note that if exit() doesn't work, this will cause a hang due to a queue.task_done().
+        print(f"{e=} {proc.returncode=}")
+        # Abort everything. Any stderr output of the VM was already passed through.
         exit(1)
-    matchup = json.loads(stdout_bin.decode())
+    # Both parsers accept the raw bytes, so there is no need to decode first.
+    if orjson is not None:
+        matchup = orjson.loads(stdout_bin)
+    else:
+        matchup = json.loads(stdout_bin)
     vm_one.matchups[vm_two.name] = matchup
+    vm_one.matchup_stats[vm_two.name] = analyze_matchup(matchup)
 
 
-def matchup_filename(vm_one, vm_two):
-    return f"matchup-{vm_one.name}-vs-{vm_two.name}.html"
+def matchup_filename(vm_one_name, vm_two_name):
+    return f"matchup-{vm_one_name}-vs-{vm_two_name}.html"
 
 
 def hashable_game(game):
-    return tuple([game["moves"], *game["res"].values(), *game["times"]])
+    # Don't rely on the iteration order of game["res"]:
+    result = game["res"]
+    return (
+        game["moves"],
+        result["type"],
+        result.get("by"),
+        result.get("reason"),
+        *game["times"],
+    )
+
+
+# This class name needs to be minimized because it saves literal megabytes in the rendered HTML.
+EMPTY_CELL_HTML = '<td class="ce"></td>'
+# Each entry is about 1 KiB of HTML, so bound the cache (per worker process) for huge tournaments:
+BOARD_CACHE_SIZE = 65536
 
 
+# Games with the same moves render to the same fragment, no matter which matchup they come from:
+@functools.lru_cache(maxsize=BOARD_CACHE_SIZE)
 def render_game_from_moves(moves):
-    # This name needs to be minimized because it saves literal megabytes in the rendered HTML.
-    board = [[("e", "")] * BOARD_WIDTH for _ in range(BOARD_HEIGHT)]
-    top_row_by_col = [BOARD_HEIGHT - 1] * BOARD_WIDTH
-    next_player = {"r": "y", "y": "r"}
-    current_player = "r"
+    # Most cells stay empty, so start from an all-empty board and only overwrite the occupied cells:
+    cells = [EMPTY_CELL_HTML] * (BOARD_WIDTH * BOARD_HEIGHT)
+    # Flat index of the lowest free cell of each column, i.e. in the bottom row at first:
+    free_index_by_col = list(
+        range((BOARD_HEIGHT - 1) * BOARD_WIDTH, BOARD_HEIGHT * BOARD_WIDTH)
+    )
     for num_move, move_col in enumerate(moves):
         col = int(move_col)
-        top_row = top_row_by_col[col]
-        top_row_by_col[col] -= 1
-        assert board[top_row][col] == ("e", "")
-        board[top_row][col] = (current_player, f"#{num_move + 1}")
-        current_player = next_player[current_player]
-    return board
-
-
-def generate_games_list(games_by_type):
-    # TODO: The type of 'games_by_type' is awkward and should be refactored.
-    games_list = [
-        (len(games_list), games_list[0]) for games_list in games_by_type.values()
-    ]
+        index = free_index_by_col[col]
+        free_index_by_col[col] -= BOARD_WIDTH
+        # Overfilling a column wraps around to its bottom cell, which is already occupied:
+        assert cells[index] is EMPTY_CELL_HTML
+        # Red moves first, so the player follows directly from the parity:
+        cells[index] = f'<td class="c{"ry"[num_move & 1]}">#{num_move + 1}</td>'
+    rows = ['<div class="game"><table>']
+    for start in range(0, BOARD_WIDTH * BOARD_HEIGHT, BOARD_WIDTH):
+        rows.append("<tr>")
+        rows.extend(cells[start : start + BOARD_WIDTH])
+        rows.append("</tr>")
+    rows.append("</table></div>")
+    return "".join(rows)
+
+
+def generate_games_list(games_list):
+    # Each entry of 'games_list' is a tuple (occurrences, game).
     limit = len(games_list)
     # We want to cut off at 20 games per page, but it's silly to cut off just a few games.
     # However, we need to draw the line (heh) somewhere, so we draw it at 25:
@@ -182,17 +228,9 @@ def generate_games_list(games_by_type):
         parts.append(
             f" (Executed {our_time} instructions in total; opponent executed {their_time} instructions in total.)</p>"
         )
-        parts.append('<div class="game"><table>')
-        board = render_game_from_moves(game["moves"])
         # TODO: Individual move timing would be quite interesting.
         # TODO: Some kind of slider that lets you see the gamestate at any point in time?
-        for row in board:
-            parts.append("<tr>")
-            for cell in row:
-                state, num_move = cell
-                parts.append(f'<td class="c{state}">{num_move}</td>')
-            parts.append("</tr>")
-        parts.append("</table></div>")
+        parts.append(render_game_from_moves(game["moves"]))
     if limit != len(games_list):
         parts.append(f"<h4>Game types #{limit + 1} through #{len(games_list)}</h4>")
         num_elided = sum(occurrences for occurrences, _ in games_list[limit:])
@@ -204,19 +242,52 @@ def generate_games_list(games_by_type):
     return "".join(parts)
 
 
-def emit_matchup(vm_one, vm_two):
-    matchup = vm_one.matchups[vm_two.name]
-    wins, draws, losses = analyze_matchup(matchup)
+# Each worker process reads and parses each template at most once, instead of once per page.
+# Joining the pre-split literals is about twice as fast as re-parsing the template with str.format.
+@functools.cache
+def parse_template(filename):
+    with open(filename, "r") as fp:
+        template = fp.read()
+    parts = []
+    for literal, field_name, format_spec, conversion in string.Formatter().parse(
+        template
+    ):
+        if format_spec or conversion:
+            raise ValueError(
+                f"Template {filename}: Field {field_name} must not use a format spec or conversion"
+            )
+        parts.append((literal, field_name))
+    return tuple(parts)
+
+
+def render_template(filename, context):
+    return "".join(
+        [
+            literal if field_name is None else literal + str(context[field_name])
+            for literal, field_name in parse_template(filename)
+        ]
+    )
+
+
+# Runs in a worker process, so it only receives the data of this one matchup, not the VMs with all of
+# their matchups. The timestamp is passed explicitly, as the worker may have re-imported this module.
+def emit_matchup(vm_one_name, vm_two_name, matchup, stats, last_build):
+    wins, draws, losses = stats
     context = dict()
-    games_by_type = collections.defaultdict(list)
+    game_counts = collections.Counter()
+    first_game_by_type = dict()
     for game in matchup:
-        # TODO: Only need one instance and the count, but I'm lazy.
-        # The correct way to do this is probably to change hashable_game's return value to something that can be easily parsed later.
-        games_by_type[hashable_game(game)].append(game)
-    context["vm_one"] = vm_one.name
-    context["vm_two"] = vm_two.name
-    context["matchup_filename"] = matchup_filename(vm_one, vm_two)
-    context["reverse_matchup_filename"] = matchup_filename(vm_two, vm_one)  # ignore W1114
+        game_type = hashable_game(game)
+        game_counts[game_type] += 1
+        first_game_by_type.setdefault(game_type, game)
+    games_list = [
+        (occurrences, first_game_by_type[game_type])
+        for game_type, occurrences in game_counts.items()
+    ]
+    context["vm_one"] = vm_one_name
+    context["vm_two"] = vm_two_name
+    context["matchup_filename"] = matchup_filename(vm_one_name, vm_two_name)
+    context["reverse_matchup_filename"] = matchup_filename(vm_two_name, vm_one_name)  # ignore W1114
     context["matchup_color"] = compute_color(wins, draws, losses)
     context["wins"], context["draws"], context["losses"] = wins, draws, losses
     context["wins_plural"] = "s" if wins != 1 else ""
@@ -228,20 +299,38 @@ def emit_matchup(vm_one, vm_two):
     # DET_TEXT_MANY_VARIED = "This matchup is not deterministic."
     if wins + draws + losses == 1:
         context["determinism_statement"] = DET_TEXT_ONE
-    elif len(games_by_type) == 1:
+    elif len(games_list) == 1:
         context["determinism_statement"] = DET_TEXT_MANY_IDENTICAL
     elif (wins == 0) + (draws == 0) + (losses == 0) == 2:
         context["determinism_statement"] = DET_TEXT_MANY_EXTREME
     else:
         context["determinism_statement"] = DET_TEXT_MANY_VARIED
-    context["games_plural"] = "" if len(games_by_type) == 1 else "s"
-    context["games_list"] = generate_games_list(games_by_type)
-    context["last_build"] = TIMESTAMP
-    with open("template_single_matchup.html", "r") as fp:
-        template = fp.read()
-    filename = OUTPUT_DIR + matchup_filename(vm_one, vm_two)
+    context["games_plural"] = "" if len(games_list) == 1 else "s"
+    context["games_list"] = generate_games_list(games_list)
+    context["last_build"] = last_build
+    filename = OUTPUT_DIR + matchup_filename(vm_one_name, vm_two_name)
     with open(filename, "w") as fp:
-        fp.write(template.format(**context))
+        fp.write(render_template("template_single_matchup.html", context))
+
+
+def emit_all_matchups(vms):
+    # Rendering the pages is pure CPU work, so spread it over all cores instead of running it on a single one.
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        futures = [
+            executor.submit(
+                emit_matchup,
+                vm_one.name,
+                vm_two.name,
+                vm_one.matchups[vm_two.name],
+                vm_one.matchup_stats[vm_two.name],
+                TIMESTAMP,
+            )
+            for vm_one in vms
+            for vm_two in vms
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            # Re-raise any exception from the worker:
+            future.result()
 
 
 def emit_vm_summary(vm, _all_vms):
@@ -249,15 +338,14 @@ def emit_vm_summary(vm, _all_vms):
     # FIXME: raise NotImplementedError()
 
 
+# Most cells share one of a handful of (wins, draws, losses) tuples, so avoid redoing the pow() calls:
+@functools.lru_cache(maxsize=None)
 def compute_color(wins, draws, losses):
-    fracs = [
-        losses / (wins + draws + losses),
-        wins / (wins + draws + losses),
-        draws / (wins + draws + losses),
-    ]
+    total = wins + draws + losses
+    fracs = [losses / total, wins / total, draws / total]
     assert 0.999 < sum(fracs) < 1.001, (wins, draws, losses, fracs)
     # This is terrible to read, but it's just gamma interpolation and conversion to hex:
-    rgb = [int(VALUE_MIN + (255 - VALUE_MIN) * (c ** (1 / GAMMA))) for c in fracs]
+    rgb = [int(VALUE_MIN + (255 - VALUE_MIN) * (c**INV_GAMMA)) for c in fracs]
     code = [f"{c:02x}" for c in rgb]
     return "#" + "".join(code)
 
@@ -277,12 +365,11 @@ def generate_overview_table(all_vms):
         parts.append("<tr>")
         parts.append(f'<th class="attacker">{vm_one.name}</th>')
         for vm_two in all_vms:
-            matchup = vm_one.matchups[vm_two.name]
-            wins, draws, losses = analyze_matchup(matchup)
+            wins, draws, losses = vm_one.matchup_stats[vm_two.name]
             color = compute_color(wins, draws, losses)
-            parts.append(f'<td class="result" style="background-color: {color};">')
-            parts.append(f'<a href="{matchup_filename(vm_one, vm_two)}">')
-            parts.append(f"{wins}/{draws}/{losses}</a></td>")
+            parts.append(
+                f'<td class="result" style="background-color: {color};"><a href="{matchup_filename(vm_one.name, vm_two.name)}">{wins}/{draws}/{losses}</a></td>'
+            )
         parts.append("</tr>")
     parts.append("</table>")
     return "".join(parts)
@@ -292,46 +379,46 @@ def emit_total_summary(all_vms):
     context = dict()
     context["overview_table"] = generate_overview_table(all_vms)
     context["last_build"] = TIMESTAMP
-    with open("template_total_summary.html", "r") as fp:
-        template = fp.read()
     with open(OUTPUT_DIR + "index.html", "w") as fp:
-        fp.write(template.format(**context))
+        fp.write(render_template("template_total_summary.html", context))
     total_dict = {vm.name: vm.matchups for vm in all_vms}
-    with open(OUTPUT_DIR + "results_general.json", "w") as fp:
-        json.dump(total_dict, fp, separators=",:", sort_keys=True)
+    if orjson is not None:
+        with open(OUTPUT_DIR + "results_general.json", "wb") as fp:
+            fp.write(orjson.dumps(total_dict, option=orjson.OPT_SORT_KEYS))
+    else:
+        with open(OUTPUT_DIR + "results_general.json", "w") as fp:
+            json.dump(total_dict, fp, separators=",:", sort_keys=True)
 
 
-async def run_matches_from_queue(queue):
-    while True:
-        job = await queue.get()
-        if job is None:
-            return
-        vm_one, vm_two = job
+async def run_matches_from_iterator(jobs, binary):
+    # One long-lived VM process per worker, instead of one process per matchup:
+    proc = await asyncio.create_subprocess_exec(
+        binary,
+        "--serve",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        limit=MATCHUP_OUTPUT_LIMIT,
+    )
+    # All workers share the same iterator. This is safe because there is no 'await' between two
+    # next() calls, and the loop ends on its own when no jobs are left.
+    for vm_one, vm_two in jobs:
         started_at = time.monotonic()
-        await run_matchup(vm_one, vm_two)
+        await run_matchup(proc, vm_one, vm_two)
         completed_at = time.monotonic()
         print(
             f"Finished matchup {vm_one.name} vs. {vm_two.name} in {completed_at - started_at:.3f}s."
         )
-        queue.task_done()
+    proc.stdin.close()
+    await proc.wait()
 
 
-async def run_all_matchups(vms):
-    # Heavily inspired by https://docs.python.org/3/library/asyncio-queue.html#examples
-    queue = asyncio.Queue()
-    for vm_one in vms:
-        for vm_two in vms:
-            queue.put_nowait((vm_one, vm_two))
+async def run_all_matchups(vms, binary):
+    jobs = iter([(vm_one, vm_two) for vm_one in vms for vm_two in vms])
     concurrency = max(1, os.cpu_count() - 1)
     print(f"Running up to {concurrency} matches in parallel ...")
     async with asyncio.TaskGroup() as tg:
         for _ in range(concurrency):
-            tg.create_task(run_matches_from_queue(queue))
-        await queue.join()
-        # TODO: Can probably start shutting down even earlier, but that's micro-optimization.
-        for _ in range(concurrency):
-            # Send shutdown signal:
-            queue.put_nowait(None)
+            tg.create_task(run_matches_from_iterator(jobs, binary))
 
 
 async def run():
@@ -343,12 +430,11 @@ async def run():
     vms = collect_vms()
     print(f"Found {len(vms)} VMs: {[vm.name for vm in vms]}")
 
-    await run_all_matchups(vms)
+    binary = build_release_binary()
+    await run_all_matchups(vms, binary)
 
     started_at = time.monotonic()
-    for vm_one in vms:
-        for vm_two in vms:
-            emit_matchup(vm_one, vm_two)
+    emit_all_matchups(vms)
     # FIXME: Should order vms by success, but no idea how to measure that.
     # Hopefully that becomes clear later.
     for vm in vms: